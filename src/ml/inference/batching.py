@@ -0,0 +1,122 @@
+"""
+Request Micro-Batching
+
+Runs blocking model calls off the event loop and coalesces concurrent
+requests into a single model call. Kept free of model imports so it can be
+tested on its own.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+async def run_model(lock: asyncio.Lock, fn: Callable[..., Any], *args, **kwargs):
+    """Run a blocking model call in a worker thread so the event loop stays free"""
+    async with lock:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into a single model call.
+
+    Texts submitted within `max_latency_ms` of each other (up to `max_batch_size`
+    texts) are run through `fn` together and the results are split back per request.
+    Requests with different keyword arguments are never mixed in one call.
+    If a fused call fails, each request is retried on its own so one bad
+    payload does not fail the requests it was batched with.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        lock: asyncio.Lock,
+        max_batch_size: int = 64,
+        max_latency_ms: float = 5
+    ):
+        self.fn = fn
+        self.lock = lock
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background batching task"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background batching task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, texts: List[str], **kwargs):
+        """Queue texts for the next batch and wait for their results"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, kwargs, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[List[str], dict, asyncio.Future]]:
+        """Drain the queue until the batch is full or the latency budget is spent"""
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_latency
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+
+        return items
+
+    async def _run_one(self, texts: List[str], options: dict, future: asyncio.Future):
+        """Run a single request on its own and resolve its future"""
+        try:
+            result = await run_model(self.lock, self.fn, texts, **options)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _run(self):
+        while True:
+            items = await self._collect()
+
+            # Only requests with identical options can share a forward pass
+            groups: Dict[tuple, list] = {}
+            for item in items:
+                groups.setdefault(tuple(sorted(item[1].items())), []).append(item)
+
+            for options, group in groups.items():
+                options = dict(options)
+                if len(group) == 1:
+                    await self._run_one(*group[0])
+                    continue
+
+                all_texts = [text for texts, _, _ in group for text in texts]
+                try:
+                    results = await run_model(self.lock, self.fn, all_texts, **options)
+                except Exception:
+                    # Isolate the failing request(s) from the rest of the batch
+                    for texts, _, future in group:
+                        await self._run_one(texts, options, future)
+                    continue
+
+                offset = 0
+                for texts, _, future in group:
+                    if not future.done():
+                        future.set_result(results[offset:offset + len(texts)])
+                    offset += len(texts)
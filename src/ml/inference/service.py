@@ -11,17 +11,23 @@ Usage:
 
 Endpoints:
     POST /embed - Generate embeddings
+    POST /embed-batch - Batch embeddings for knowledge base ingestion
+    POST /embed-batch-binary - Batch embeddings as a raw FP16 buffer
     POST /classify-emergency - Detect emergencies
     POST /translate - Translate text
     GET /health - Health check
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
+import asyncio
+import orjson
 import sys
 from pathlib import Path
+from urllib.parse import quote
 import os
 
 # Add parent directory to path
@@ -30,13 +36,15 @@ sys.path.append(str(Path(__file__).parent.parent))
 from models.embedding_model import EmbeddingModel
 from models.emergency_classifier import EmergencyClassifier
 from models.translation_model import TranslationModel
+from inference.batching import MicroBatcher, run_model
 from loguru import logger
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SwasthyaSahayak ML Inference Service",
     description="AI/ML models for health chatbot",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -56,6 +64,29 @@ translation_model: Optional[TranslationModel] = None
 # Model versions
 model_versions: dict = {}
 
+# Micro-batching settings
+BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_LATENCY_MS = float(os.getenv("ML_BATCH_MAX_LATENCY_MS", "5"))
+
+# Compile encoder models with torch.compile at load time
+TORCH_COMPILE = os.getenv("ML_TORCH_COMPILE", "false").lower() == "true"
+
+# Capture CUDA graphs for single-query embedding (ignored when torch.compile is on)
+CUDA_GRAPHS = os.getenv("ML_CUDA_GRAPHS", "false").lower() == "true"
+
+# Draft model for assisted translation decoding (disabled when unset)
+TRANSLATION_DRAFT_MODEL = os.getenv("TRANSLATION_DRAFT_MODEL") or None
+
+# One lock per model: HF tokenizers and TranslationModel.src_lang are not reentrant
+embedding_lock = asyncio.Lock()
+classifier_lock = asyncio.Lock()
+translation_lock = asyncio.Lock()
+
+# Micro-batchers (started at startup)
+embedding_batcher: Optional[MicroBatcher] = None
+classifier_batcher: Optional[MicroBatcher] = None
+translation_batcher: Optional[MicroBatcher] = None
+
 
 # Request/Response models
 class EmbedRequest(BaseModel):
@@ -83,6 +114,7 @@ class TranslateRequest(BaseModel):
     texts: List[str]
     source_lang: Optional[str] = None
     target_lang: str = "en"
+    fast: bool = Field(default=True, description="Greedy decoding; false for beam search")
 
 
 class TranslateResponse(BaseModel):
@@ -95,28 +127,25 @@ class TranslateResponse(BaseModel):
 async def load_models():
     """Load ML models at startup"""
     global embedding_model, emergency_classifier, translation_model, model_versions
+    global embedding_batcher, classifier_batcher, translation_batcher
     
     try:
-        logger.info("=" * 60)
         logger.info("🚀 Starting SwasthyaSahayak ML Inference Service")
-        logger.info("=" * 60)
         
         # Load model registry
         registry_path = Path(__file__).parent.parent / "models" / "registry.json"
         if registry_path.exists():
-            import json
-            with open(registry_path, 'r') as f:
-                registry = json.load(f)
-                model_versions = {
-                    'embedding_model': registry.get('embedding_model', 'unknown'),
-                    'emergency_classifier': registry.get('emergency_classifier', 'unknown'),
-                    'translation_model': registry.get('translation_model', 'unknown'),
-                    'last_updated': registry.get('last_updated', 'unknown')
-                }
-            logger.info(f"📋 Model Registry Loaded:")
-            for name, version in model_versions.items():
-                if name != 'last_updated':
-                    logger.info(f"   • {name}: {version}")
+            registry = orjson.loads(registry_path.read_bytes())
+            model_versions = {
+                'embedding_model': registry.get('embedding_model', 'unknown'),
+                'emergency_classifier': registry.get('emergency_classifier', 'unknown'),
+                'translation_model': registry.get('translation_model', 'unknown'),
+                'last_updated': registry.get('last_updated', 'unknown')
+            }
+            logger.info(
+                "📋 Model Registry Loaded: "
+                + ", ".join(f"{name} {version}" for name, version in model_versions.items() if name != 'last_updated')
+            )
         else:
             logger.warning(f"⚠️  Model registry not found at {registry_path}")
             model_versions = {
@@ -126,46 +155,61 @@ async def load_models():
                 'last_updated': 'unknown'
             }
         
-        logger.info("")
         logger.info("Loading ML models...")
         
         # Load embedding model
         embedding_path = os.getenv("EMBEDDING_MODEL_PATH", "./models/embeddings/model_v1")
         if Path(embedding_path).exists():
             logger.info(f"✓ Loading embedding model from {embedding_path}")
-            embedding_model = EmbeddingModel.load(embedding_path)
+            embedding_model = EmbeddingModel.load(
+                embedding_path, compile_model=TORCH_COMPILE, cuda_graphs=CUDA_GRAPHS
+            )
         else:
             logger.warning(f"⚠️  Embedding model not found at {embedding_path}, using default")
-            embedding_model = EmbeddingModel()
+            embedding_model = EmbeddingModel(compile_model=TORCH_COMPILE, cuda_graphs=CUDA_GRAPHS)
         
         # Load emergency classifier
         classifier_path = os.getenv("EMERGENCY_CLASSIFIER_PATH", "./models/emergency/model_v1")
         if Path(classifier_path).exists():
             logger.info(f"✓ Loading emergency classifier from {classifier_path}")
-            emergency_classifier = EmergencyClassifier.load(classifier_path)
+            emergency_classifier = EmergencyClassifier.load(classifier_path, compile_model=TORCH_COMPILE)
         else:
             logger.warning(f"⚠️  Emergency classifier not found, using default")
-            emergency_classifier = EmergencyClassifier()
+            emergency_classifier = EmergencyClassifier(compile_model=TORCH_COMPILE)
         
         # Load translation model
         translation_path = os.getenv("TRANSLATION_MODEL_PATH", "./models/translation/model_v1")
         if Path(translation_path).exists():
             logger.info(f"✓ Loading translation model from {translation_path}")
-            translation_model = TranslationModel.load(translation_path)
+            translation_model = TranslationModel.load(translation_path, draft_model_name=TRANSLATION_DRAFT_MODEL)
         else:
             logger.warning(f"⚠️  Translation model not found, using default")
-            translation_model = TranslationModel()
+            translation_model = TranslationModel(draft_model_name=TRANSLATION_DRAFT_MODEL)
+        
+        # Start micro-batchers for the per-request endpoints
+        batch_settings = {'max_batch_size': BATCH_MAX_SIZE, 'max_latency_ms': BATCH_MAX_LATENCY_MS}
+        embedding_batcher = MicroBatcher(embedding_model.encode, embedding_lock, **batch_settings)
+        classifier_batcher = MicroBatcher(emergency_classifier.predict, classifier_lock, **batch_settings)
+        translation_batcher = MicroBatcher(translation_model.translate, translation_lock, **batch_settings)
+        for batcher in (embedding_batcher, classifier_batcher, translation_batcher):
+            batcher.start()
+        logger.info(f"Micro-batching enabled (max {BATCH_MAX_SIZE} texts, {BATCH_MAX_LATENCY_MS}ms)")
         
-        logger.info("")
-        logger.info("=" * 60)
         logger.info("✅ All models loaded successfully!")
-        logger.info("=" * 60)
         
     except Exception as e:
         logger.error(f"❌ Error loading models: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def stop_batchers():
+    """Stop micro-batching tasks on shutdown"""
+    for batcher in (embedding_batcher, classifier_batcher, translation_batcher):
+        if batcher is not None:
+            await batcher.stop()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -190,6 +234,30 @@ async def get_versions():
     return model_versions
 
 
+def embedding_response(embeddings, model: str) -> ORJSONResponse:
+    """
+    Build an embedding response from an ndarray.
+    
+    ORJSONResponse serializes the ndarray natively, skipping Pydantic validation.
+    """
+    return ORJSONResponse({
+        "embeddings": embeddings,
+        "dimension": embeddings.shape[1],
+        "model": model
+    })
+
+
+async def encode_batch(model: EmbeddingModel, request: EmbedRequest):
+    """Encode a large request directly, bypassing the micro-batcher"""
+    return await run_model(
+        embedding_lock,
+        model.encode,
+        request.texts,
+        batch_size=32,  # Optimal batch size for GPU efficiency
+        normalize=request.normalize
+    )
+
+
 @app.post("/embed", response_model=EmbedResponse)
 async def generate_embeddings(request: EmbedRequest):
     """
@@ -202,20 +270,16 @@ async def generate_embeddings(request: EmbedRequest):
             "normalize": true
         }
     """
-    if embedding_model is None:
+    if embedding_model is None or embedding_batcher is None:
         raise HTTPException(status_code=503, detail="Embedding model not loaded")
     
     try:
-        embeddings = embedding_model.encode(
+        embeddings = await embedding_batcher.submit(
             request.texts,
             normalize=request.normalize
         )
         
-        return EmbedResponse(
-            embeddings=embeddings.tolist(),
-            dimension=embeddings.shape[1],
-            model=request.model
-        )
+        return embedding_response(embeddings, request.model)
     
     except Exception as e:
         logger.error(f"Embedding error: {e}")
@@ -244,27 +308,53 @@ async def generate_embeddings_batch(request: EmbedRequest):
     try:
         logger.info(f"Batch embedding request: {len(request.texts)} texts")
         
-        # Process in optimal batches (32 at a time for GPU efficiency)
-        batch_size = 32
-        embeddings = embedding_model.encode(
-            request.texts,
-            batch_size=batch_size,
-            normalize=request.normalize
-        )
+        embeddings = await encode_batch(embedding_model, request)
         
         logger.info(f"✅ Generated {len(embeddings)} embeddings")
         
-        return EmbedResponse(
-            embeddings=embeddings.tolist(),
-            dimension=embeddings.shape[1],
-            model=request.model
-        )
+        return embedding_response(embeddings, request.model)
     
     except Exception as e:
         logger.error(f"Batch embedding error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/embed-batch-binary")
+async def generate_embeddings_batch_binary(request: EmbedRequest):
+    """
+    Batch embedding generation returning a raw little-endian FP16 buffer.
+    
+    The body holds `rows * dimension` float16 values in row-major order;
+    the shape is given in the `X-Shape` header as "rows,dimension" and the
+    requested model, percent-encoded, in `X-Model`.
+    
+    Example (client side):
+        np.frombuffer(body, dtype='<f2').reshape(rows, dimension)
+    """
+    if embedding_model is None:
+        raise HTTPException(status_code=503, detail="Embedding model not loaded")
+    
+    try:
+        logger.info(f"Binary batch embedding request: {len(request.texts)} texts")
+        
+        embeddings = await encode_batch(embedding_model, request)
+        
+        return Response(
+            content=embeddings.astype('<f2').tobytes(),
+            media_type="application/octet-stream",
+            headers={
+                "X-Shape": f"{embeddings.shape[0]},{embeddings.shape[1]}",
+                "X-Dtype": "float16",
+                # Headers are latin-1; percent-encode the free-form model name
+                "X-Model": quote(request.model, safe='')
+            }
+        )
+    
+    except Exception as e:
+        logger.error(f"Binary batch embedding error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/classify-emergency", response_model=ClassifyResponse)
 async def classify_emergency(request: ClassifyRequest):
     """
@@ -277,11 +367,11 @@ async def classify_emergency(request: ClassifyRequest):
             "use_keyword_fallback": true
         }
     """
-    if emergency_classifier is None:
+    if emergency_classifier is None or classifier_batcher is None:
         raise HTTPException(status_code=503, detail="Emergency classifier not loaded")
     
     try:
-        predictions = emergency_classifier.predict(
+        predictions = await classifier_batcher.submit(
             request.texts,
             use_keyword_fallback=request.use_keyword_fallback
         )
@@ -310,7 +400,7 @@ async def translate_text(request: TranslateRequest):
             "target_lang": "en"
         }
     """
-    if translation_model is None:
+    if translation_model is None or translation_batcher is None:
         raise HTTPException(status_code=503, detail="Translation model not loaded")
     
     try:
@@ -323,10 +413,11 @@ async def translate_text(request: TranslateRequest):
             detected_langs = [request.source_lang] * len(request.texts)
         
         # Translate
-        translations = translation_model.translate(
+        translations = await translation_batcher.submit(
             request.texts,
             source_lang=request.source_lang,
-            target_lang=request.target_lang
+            target_lang=request.target_lang,
+            fast=request.fast
         )
         
         if isinstance(translations, str):
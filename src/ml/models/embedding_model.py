@@ -12,10 +12,34 @@ Model: Fine-tuned sentence-transformers on health domain data
 
 import torch
 import torch.nn as nn
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 from transformers import AutoTokenizer, AutoModel
 import numpy as np
 
+import sys
+from pathlib import Path
+
+# Add parent directory to path so the examples below also run as scripts
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models import onnx_runtime
+from models.lru_cache import LRUCache
+from models.model_setup import build_forward, ensure_unquantized, open_onnx_session, prepare_for_inference
+from models.pinned_pool import PinnedPool
+
+
+class _PooledEncoder(nn.Module):
+    """Encoder + mean pooling as one module, used for ONNX export"""
+    
+    def __init__(self, model: nn.Module, pooling):
+        super().__init__()
+        self.model = model
+        self.pooling = pooling
+    
+    def forward(self, input_ids, attention_mask):
+        model_output = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return self.pooling(model_output, attention_mask)
+
 
 class EmbeddingModel:
     """
@@ -25,13 +49,26 @@ class EmbeddingModel:
         model_name: Base model identifier (e.g., 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2')
         device: Computing device (cuda/cpu)
         max_length: Maximum sequence length
+        compile_model: Fuse encoder kernels with torch.compile (PyTorch 2.x)
+        onnx_path: Exported ONNX graph to run with ONNX Runtime instead of PyTorch
+        quantize: Apply INT8 dynamic quantization (defaults to True on CPU, skipped with onnx_path)
+        cache_size: Number of embeddings kept in the LRU cache (0 disables it)
+        cuda_graphs: Capture CUDA graphs for single-text inference at fixed sequence buckets
     """
     
+    # Padded sequence lengths captured as CUDA graphs for batch size 1
+    CUDA_GRAPH_BUCKETS = (32, 64, 128, 256, 512)
+    
     def __init__(
         self,
         model_name: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
         device: str = "cuda" if torch.cuda.is_available() else "cpu",
-        max_length: int = 512
+        max_length: int = 512,
+        compile_model: bool = False,
+        onnx_path: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        cache_size: int = 10000,
+        cuda_graphs: bool = False
     ):
         self.model_name = model_name
         self.device = device
@@ -40,13 +77,81 @@ class EmbeddingModel:
         # Load tokenizer and model
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name).to(device)
-        self.model.eval()
+        
+        # FP16 on GPU, INT8 dynamic quantization on CPU
+        self.model, self.quantized = prepare_for_inference(self.model, device, quantize, onnx_path)
+        
+        # Pinned staging buffers for async host-to-device copies
+        self._pinned_pool = PinnedPool(device)
+        
+        # Optionally compiled forward and ONNX Runtime session
+        self._forward = build_forward(self.model, compile_model)
+        self._ort_session = open_onnx_session(onnx_path, device)
+        
+        # Embeddings of recently seen texts, keyed by (text, normalize)
+        self._cache = LRUCache(cache_size)
+        
+        # torch.compile(mode='reduce-overhead') already records its own CUDA graphs
+        self._graphs: Dict[int, tuple] = {}
+        if cuda_graphs and 'cuda' in device and not compile_model and self._ort_session is None:
+            self._capture_cuda_graphs()
+    
+    def _pooled_forward(self, input_ids, attention_mask):
+        """Encoder forward + mean pooling in FP32"""
+        with torch.amp.autocast('cuda', dtype=torch.float16):
+            model_output = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            return self.mean_pooling(model_output, attention_mask).float()
+    
+    def _capture_cuda_graphs(self):
+        """Capture forward + pooling for a single text at each sequence bucket"""
+        pool = torch.cuda.graph_pool_handle()
+        pad_id = self.tokenizer.pad_token_id or 0
+        side_stream = torch.cuda.Stream()
+        
+        with torch.inference_mode():
+            for seq_len in self.CUDA_GRAPH_BUCKETS:
+                if seq_len > self.max_length:
+                    break
+                input_ids = torch.full((1, seq_len), pad_id, dtype=torch.long, device=self.device)
+                attention_mask = torch.ones((1, seq_len), dtype=torch.long, device=self.device)
+                
+                # Warm up on a side stream before capture, as torch.cuda.graph requires
+                side_stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(side_stream):
+                    for _ in range(2):
+                        self._pooled_forward(input_ids, attention_mask)
+                torch.cuda.current_stream().wait_stream(side_stream)
+                
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph, pool=pool):
+                    output = self._pooled_forward(input_ids, attention_mask)
+                self._graphs[seq_len] = (graph, input_ids, attention_mask, output)
+    
+    def _replay_cuda_graph(self, encoded) -> Optional[torch.Tensor]:
+        """Run a single-text batch through a captured graph, or return None if none fits"""
+        batch, seq_len = encoded['input_ids'].shape
+        if batch != 1:
+            return None
+        bucket = next((b for b in self._graphs if b >= seq_len), None)
+        if bucket is None:
+            return None
+        
+        graph, input_ids, attention_mask, output = self._graphs[bucket]
+        input_ids.fill_(self.tokenizer.pad_token_id or 0)
+        attention_mask.zero_()
+        input_ids[:, :seq_len].copy_(encoded['input_ids'])
+        attention_mask[:, :seq_len].copy_(encoded['attention_mask'])
+        graph.replay()
+        return output
     
     def mean_pooling(self, model_output, attention_mask):
         """Apply mean pooling to get sentence embeddings"""
         token_embeddings = model_output[0]
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-        return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+        # Masked average as one batched matmul: token embeddings are read once and no
+        # (batch, seq, hidden) mask is materialised. Weights sum to 1, so FP16 cannot overflow.
+        counts = torch.clamp(attention_mask.sum(1, keepdim=True), min=1)
+        weights = (attention_mask / counts).to(token_embeddings.dtype).unsqueeze(1)
+        return torch.bmm(weights, token_embeddings).squeeze(1)
     
     def encode(
         self,
@@ -68,44 +173,134 @@ class EmbeddingModel:
         if isinstance(texts, str):
             texts = [texts]
         
-        embeddings = []
+        if not texts:
+            return np.empty((0, self.model.config.hidden_size), dtype=np.float32)
+        
+        if self._cache.maxsize <= 0:
+            return self._encode(texts, batch_size, normalize)
         
-        with torch.no_grad():
+        # Serve repeated texts from the cache and only encode the misses
+        rows = [self._cache.get((text, normalize)) for text in texts]
+        misses = list(dict.fromkeys(text for text, row in zip(texts, rows) if row is None))
+        if misses:
+            computed = dict(zip(misses, self._encode(misses, batch_size, normalize)))
+            for text, row in computed.items():
+                self._cache.put((text, normalize), row.copy())
+            rows = [computed[text] if row is None else row for text, row in zip(texts, rows)]
+        
+        return np.stack(rows)
+    
+    def _encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        """Run the forward pass for a non-empty list of texts"""
+        # Batch texts of similar token length together to minimise padding;
+        # a single batch pads to its longest text anyway, so skip the extra pass
+        order = None
+        if len(texts) > batch_size:
+            lengths = self.tokenizer(
+                texts,
+                add_special_tokens=False,
+                truncation=True,
+                max_length=self.max_length,
+                return_length=True
+            )['length']
+            order = np.argsort(lengths, kind='stable')
+        
+        # Host output buffer in sorted order; pinned so per-batch D2H copies are async
+        copy_async = 'cuda' in self.device and self._ort_session is None
+        sorted_embeddings = torch.empty(
+            (len(texts), self.model.config.hidden_size),
+            dtype=torch.float32,
+            pin_memory=copy_async
+        )
+        staged_buffers = []
+        use_amp = 'cuda' in self.device
+        
+        with torch.inference_mode(), torch.amp.autocast('cuda', dtype=torch.float16, enabled=use_amp):
             for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
+                if order is None:
+                    batch = texts[i:i + batch_size]
+                else:
+                    batch = [texts[j] for j in order[i:i + batch_size]]
                 
                 # Tokenize
                 encoded = self.tokenizer(
                     batch,
                     padding=True,
+                    pad_to_multiple_of=8,
                     truncation=True,
                     max_length=self.max_length,
                     return_tensors='pt'
-                ).to(self.device)
+                )
                 
-                # Generate embeddings
-                model_output = self.model(**encoded)
-                batch_embeddings = self.mean_pooling(model_output, encoded['attention_mask'])
+                if self._ort_session is not None:
+                    # Pooled embeddings straight from the ONNX graph
+                    pooled = onnx_runtime.run(self._ort_session, encoded, 'embeddings', self.device)
+                    batch_embeddings = torch.from_numpy(pooled).float()
+                else:
+                    encoded, staged = self._pinned_pool.transfer(encoded)
+                    staged_buffers.extend(staged)
+                    
+                    # Generate embeddings
+                    batch_embeddings = self._replay_cuda_graph(encoded) if self._graphs else None
+                    if batch_embeddings is None:
+                        model_output = self._forward(**encoded)
+                        # Upcast pooled output to FP32 before normalizing to avoid precision loss
+                        batch_embeddings = self.mean_pooling(model_output, encoded['attention_mask']).float()
                 
                 # Normalize if requested
                 if normalize:
                     batch_embeddings = torch.nn.functional.normalize(batch_embeddings, p=2, dim=1)
                 
-                embeddings.append(batch_embeddings.cpu().numpy())
+                sorted_embeddings[i:i + len(batch)].copy_(batch_embeddings, non_blocking=copy_async)
         
-        return np.vstack(embeddings)
+        # Single sync for all batches, after which the staged inputs can be reused
+        if copy_async:
+            torch.cuda.synchronize(self.device)
+        self._pinned_pool.release(staged_buffers)
+        
+        # Scatter back to input order
+        sorted_embeddings = sorted_embeddings.numpy()
+        if order is None:
+            return sorted_embeddings
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings
     
     def save(self, path: str):
         """Save model to disk"""
+        ensure_unquantized(self.quantized, "save")
         self.model.save_pretrained(path)
         self.tokenizer.save_pretrained(path)
     
+    def to_onnx(self, path: str, opset: int = 17):
+        """Export encoder + mean pooling to ONNX with dynamic batch/sequence axes"""
+        ensure_unquantized(self.quantized, "export")
+        onnx_runtime.export(
+            _PooledEncoder(self.model, self.mean_pooling),
+            path,
+            output_name='embeddings',
+            device=self.device,
+            opset=opset
+        )
+    
     @classmethod
-    def load(cls, path: str, device: str = None):
-        """Load model from disk"""
+    def load(
+        cls,
+        path: str,
+        device: str = None,
+        compile_model: bool = False,
+        cuda_graphs: bool = False
+    ):
+        """Load model from disk, using ONNX Runtime if `model.onnx` exists next to it"""
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
-        return cls(model_name=path, device=device)
+        return cls(
+            model_name=path,
+            device=device,
+            compile_model=compile_model,
+            onnx_path=onnx_runtime.find_onnx_model(path),
+            cuda_graphs=cuda_graphs
+        )
 
 
 if __name__ == "__main__":
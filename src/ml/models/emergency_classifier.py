@@ -13,8 +13,36 @@ Model: BERT-based classifier fine-tuned on emergency medical scenarios
 import torch
 import torch.nn as nn
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import List, Tuple, Union
+from typing import List, Optional, Pattern, Tuple, Union
 import numpy as np
+import re
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so the examples below also run as scripts
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models import onnx_runtime
+from models.lru_cache import LRUCache
+from models.model_setup import build_forward, ensure_unquantized, open_onnx_session, prepare_for_inference
+from models.pinned_pool import PinnedPool
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional accelerator
+    ahocorasick = None
+
+
+class _LogitsOnly(nn.Module):
+    """Sequence classifier returning bare logits, used for ONNX export"""
+    
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
 
 
 class EmergencyClassifier:
@@ -54,7 +82,11 @@ class EmergencyClassifier:
         self,
         model_name: str = "bert-base-multilingual-cased",
         device: str = "cuda" if torch.cuda.is_available() else "cpu",
-        threshold: float = 0.75
+        threshold: float = 0.75,
+        compile_model: bool = False,
+        onnx_path: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        cache_size: int = 10000
     ):
         """
         Initialize emergency classifier.
@@ -63,24 +95,52 @@ class EmergencyClassifier:
             model_name: Pretrained model or path to fine-tuned model
             device: Computing device
             threshold: Confidence threshold for emergency classification
+            compile_model: Fuse encoder kernels with torch.compile (PyTorch 2.x)
+            onnx_path: Exported ONNX graph to run with ONNX Runtime instead of PyTorch
+            quantize: Apply INT8 dynamic quantization (defaults to True on CPU, skipped with onnx_path)
+            cache_size: Number of predictions kept in the LRU cache (0 disables it)
         """
         self.device = device
         self.threshold = threshold
         
+        # Compile all keywords into a single matcher for the fallback path
+        self._automaton = None
+        self._keyword_re: Optional[Pattern[str]] = None
+        keywords = [kw.lower() for kws in self.EMERGENCY_KEYWORDS.values() for kw in kws]
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for kw in keywords:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+        else:
+            self._keyword_re = re.compile('|'.join(map(re.escape, keywords)))
+        
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForSequenceClassification.from_pretrained(
             model_name,
             num_labels=2  # Binary: emergency vs non-emergency
         ).to(device)
-        self.model.eval()
+        
+        # FP16 on GPU, INT8 dynamic quantization on CPU
+        self.model, self.quantized = prepare_for_inference(self.model, device, quantize, onnx_path)
+        
+        # Pinned staging buffers for async host-to-device copies
+        self._pinned_pool = PinnedPool(device)
+        
+        # Optionally compiled forward and ONNX Runtime session
+        self._forward = build_forward(self.model, compile_model)
+        self._ort_session = open_onnx_session(onnx_path, device)
+        
+        # Emergency probabilities of recently seen queries
+        self._cache = LRUCache(cache_size)
     
     def keyword_based_detection(self, text: str) -> bool:
         """Fallback rule-based emergency detection"""
         text_lower = text.lower()
-        for lang_keywords in self.EMERGENCY_KEYWORDS.values():
-            if any(keyword in text_lower for keyword in lang_keywords):
-                return True
-        return False
+        if self._automaton is not None:
+            return next(self._automaton.iter(text_lower), None) is not None
+        assert self._keyword_re is not None
+        return self._keyword_re.search(text_lower) is not None
     
     def predict(
         self,
@@ -100,48 +160,95 @@ class EmergencyClassifier:
         if isinstance(texts, str):
             texts = [texts]
         
+        # Model probabilities for repeated queries come from the cache
+        probabilities = [self._cache.get(text) for text in texts]
+        misses = list(dict.fromkeys(text for text, prob in zip(texts, probabilities) if prob is None))
+        if misses:
+            computed = dict(zip(misses, self._emergency_probabilities(misses)))
+            for text, prob in computed.items():
+                self._cache.put(text, prob)
+            probabilities = [computed[text] if prob is None else prob for text, prob in zip(texts, probabilities)]
+        
         results = []
         
-        with torch.no_grad():
+        # Process each prediction
+        for text, emergency_prob in zip(texts, probabilities):
+            is_emergency = emergency_prob > self.threshold
+            
+            # Apply keyword fallback if enabled and confidence is low
+            if use_keyword_fallback and not is_emergency:
+                if self.keyword_based_detection(text):
+                    is_emergency = True
+                    emergency_prob = 0.90  # Assign high confidence for keyword match
+            
+            results.append((is_emergency, emergency_prob))
+        
+        return results
+    
+    def _emergency_probabilities(self, texts: List[str]) -> List[float]:
+        """Run the classifier and return the emergency-class probability per text"""
+        use_amp = 'cuda' in self.device
+        
+        with torch.inference_mode(), torch.amp.autocast('cuda', dtype=torch.float16, enabled=use_amp):
             # Tokenize
             encoded = self.tokenizer(
                 texts,
                 padding=True,
+                pad_to_multiple_of=8,
                 truncation=True,
                 max_length=512,
                 return_tensors='pt'
-            ).to(self.device)
+            )
             
             # Get predictions
-            outputs = self.model(**encoded)
-            probabilities = torch.softmax(outputs.logits, dim=1)
-            
-            # Process each prediction
-            for i, text in enumerate(texts):
-                emergency_prob = probabilities[i][1].item()  # Probability of emergency class
-                is_emergency = emergency_prob > self.threshold
-                
-                # Apply keyword fallback if enabled and confidence is low
-                if use_keyword_fallback and not is_emergency:
-                    if self.keyword_based_detection(text):
-                        is_emergency = True
-                        emergency_prob = 0.90  # Assign high confidence for keyword match
-                
-                results.append((is_emergency, emergency_prob))
+            if self._ort_session is not None:
+                logits = onnx_runtime.run(self._ort_session, encoded, 'logits', self.device)
+                probabilities = torch.softmax(torch.from_numpy(logits).float(), dim=1)
+            else:
+                encoded, staged = self._pinned_pool.transfer(encoded)
+                outputs = self._forward(**encoded)
+                probabilities = torch.softmax(outputs.logits.float(), dim=1).cpu()
+                self._pinned_pool.release(staged)
         
-        return results
+        # Probability of emergency class
+        emergency_probs: List[float] = probabilities[:, 1].tolist()
+        return emergency_probs
     
     def save(self, path: str):
         """Save fine-tuned model"""
+        ensure_unquantized(self.quantized, "save")
         self.model.save_pretrained(path)
         self.tokenizer.save_pretrained(path)
     
+    def to_onnx(self, path: str, opset: int = 17):
+        """Export the classifier to ONNX with dynamic batch/sequence axes"""
+        ensure_unquantized(self.quantized, "export")
+        onnx_runtime.export(
+            _LogitsOnly(self.model),
+            path,
+            output_name='logits',
+            device=self.device,
+            opset=opset
+        )
+    
     @classmethod
-    def load(cls, path: str, device: str = None, threshold: float = 0.75):
-        """Load fine-tuned model"""
+    def load(
+        cls,
+        path: str,
+        device: str = None,
+        threshold: float = 0.75,
+        compile_model: bool = False
+    ):
+        """Load fine-tuned model, using ONNX Runtime if `model.onnx` exists next to it"""
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
-        return cls(model_name=path, device=device, threshold=threshold)
+        return cls(
+            model_name=path,
+            device=device,
+            threshold=threshold,
+            compile_model=compile_model,
+            onnx_path=onnx_runtime.find_onnx_model(path)
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""
+Inference Setup Helpers
+
+Shared setup for the PyTorch models: FP16 weights (and TF32 matmuls) on GPU,
+INT8 dynamic quantization of the linear layers on CPU, the optionally compiled
+forward and the optional ONNX Runtime session.
+
+Quantized modules cannot be saved with `save_pretrained` or exported to ONNX,
+so models keep a `quantized` flag and check it with `ensure_unquantized`.
+"""
+
+import torch
+import torch.nn as nn
+from typing import Any, Callable, Optional, Tuple
+
+from models import onnx_runtime
+
+
+def prepare_for_inference(
+    model: nn.Module,
+    device: str,
+    quantize: Optional[bool] = None,
+    onnx_path: Optional[str] = None
+) -> Tuple[nn.Module, bool]:
+    """
+    Put a model in eval mode with the fastest weight format for its device.
+
+    Args:
+        model: Model already moved to `device`
+        device: Device the model runs on
+        quantize: Apply INT8 dynamic quantization (defaults to True on CPU)
+        onnx_path: ONNX graph used instead of the PyTorch forward; quantization
+            is skipped since the PyTorch model never runs
+
+    Returns:
+        (prepared model, whether it was quantized)
+    """
+    # Half-precision weights on GPU so the transformer matmuls run on tensor cores
+    if 'cuda' in device:
+        torch.backends.cuda.matmul.allow_tf32 = True
+        model = model.half()
+
+    model.eval()
+
+    # INT8 dynamic quantization of the linear layers for CPU inference
+    if quantize is None:
+        quantize = device == 'cpu'
+    quantize = quantize and onnx_path is None
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    return model, quantize
+
+
+def build_forward(model: nn.Module, compile_model: bool = False) -> Callable[..., Any]:
+    """
+    Return the callable used for the forward pass.
+
+    The compiled forward fuses LayerNorm/GeLU/attention (PyTorch 2.x); the model
+    itself stays uncompiled so it can still be saved.
+    """
+    forward: Callable[..., Any] = model
+    if compile_model and hasattr(torch, 'compile'):
+        forward = torch.compile(model, mode='reduce-overhead', fullgraph=False)
+    return forward
+
+
+def open_onnx_session(onnx_path: Optional[str], device: str):
+    """ONNX Runtime session (TensorRT/CUDA providers) for an exported graph, or None"""
+    if onnx_path is None:
+        return None
+    return onnx_runtime.create_session(onnx_path, device)
+
+
+def ensure_unquantized(quantized: bool, action: str = "save"):
+    """Raise if a quantized model is about to be saved or exported"""
+    if quantized:
+        raise RuntimeError(f"Cannot {action} a quantized model; create it with quantize=False to {action}")
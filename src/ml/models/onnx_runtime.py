@@ -0,0 +1,90 @@
+"""
+ONNX Runtime Helpers
+
+Shared export and session setup for the encoder models. When a `model.onnx`
+file sits next to a checkpoint, the models run their forward pass through
+ONNX Runtime (TensorRT/CUDA execution providers) instead of PyTorch eager mode.
+
+onnxruntime is optional; without it the PyTorch path is always used.
+"""
+
+import torch
+import torch.nn as nn
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import onnxruntime as ort
+except ImportError:  # pragma: no cover - optional accelerator
+    ort = None
+
+
+ONNX_FILENAME = "model.onnx"
+INPUT_NAMES = ['input_ids', 'attention_mask']
+
+
+def find_onnx_model(path: str) -> Optional[str]:
+    """Return the exported ONNX file for a checkpoint directory, if usable"""
+    onnx_path = Path(path) / ONNX_FILENAME
+    if ort is not None and onnx_path.exists():
+        return str(onnx_path)
+    return None
+
+
+def create_session(onnx_path: str, device: str):
+    """Create an inference session preferring TensorRT (FP16), then CUDA, then CPU"""
+    if ort is None:
+        raise ImportError("onnxruntime is required for ONNX inference")
+
+    providers: List[Union[str, Tuple[str, Dict[str, Any]]]] = []
+    if 'cuda' in device:
+        providers.append(('TensorrtExecutionProvider', {'trt_fp16_enable': True}))
+        providers.append('CUDAExecutionProvider')
+    providers.append('CPUExecutionProvider')
+    available = set(ort.get_available_providers())
+    providers = [p for p in providers if (p[0] if isinstance(p, tuple) else p) in available]
+    return ort.InferenceSession(onnx_path, providers=providers)
+
+
+def export(module: nn.Module, path: str, output_name: str, device: str, opset: int = 17):
+    """
+    Export a module taking (input_ids, attention_mask) with dynamic batch/sequence axes.
+
+    Args:
+        module: Module whose forward takes input_ids and attention_mask
+        path: Destination .onnx file
+        output_name: Name of the single graph output
+        device: Device the module lives on
+        opset: ONNX opset version
+    """
+    dummy = (
+        torch.ones((1, 8), dtype=torch.long, device=device),
+        torch.ones((1, 8), dtype=torch.long, device=device),
+    )
+    dynamic_axes = {name: {0: 'batch', 1: 'seq'} for name in INPUT_NAMES}
+    dynamic_axes[output_name] = {0: 'batch'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            dummy,
+            path,
+            input_names=INPUT_NAMES,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+
+
+def run(session, encoded, output_name: str, device: str):
+    """
+    Run a session via IO binding and return the output as a numpy array.
+
+    The output is bound on the device so it is only copied to the host once.
+    """
+    binding = session.io_binding()
+    for name in INPUT_NAMES:
+        binding.bind_cpu_input(name, encoded[name].numpy())
+    binding.bind_output(output_name, 'cuda' if 'cuda' in device else 'cpu')
+    session.run_with_iobinding(binding)
+    return binding.copy_outputs_to_cpu()[0]
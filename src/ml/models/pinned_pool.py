@@ -0,0 +1,74 @@
+"""
+Pinned Host Memory Pool
+
+Reusable page-locked CPU buffers for staging tokenizer output before the
+host-to-device copy. Pinned memory lets `.to(device, non_blocking=True)` run as
+an async DMA, and reusing buffers avoids a fresh pinned allocation per batch.
+
+Buffers are bucketed by byte size in 2048-byte chunks so tensors of slightly
+different shapes (e.g. sequence lengths padded to a multiple of 8) share buffers.
+"""
+
+import torch
+from collections import defaultdict
+from typing import Dict, List, Mapping, Tuple
+
+
+class PinnedPool:
+    """
+    Pool of pinned CPU buffers keyed by (dtype, capacity in bytes).
+
+    On non-CUDA devices tensors are moved directly and no buffers are rented.
+    """
+
+    CHUNK_BYTES = 2048
+
+    def __init__(self, device: str, max_per_bucket: int = 4):
+        self.device = device
+        self.enabled = 'cuda' in device and torch.cuda.is_available()
+        self.max_per_bucket = max_per_bucket
+        self._free: Dict[Tuple[torch.dtype, int], List[torch.Tensor]] = defaultdict(list)
+
+    def _rent(self, dtype: torch.dtype, nbytes: int) -> torch.Tensor:
+        """Get a flat pinned buffer holding at least `nbytes`"""
+        capacity = -(-nbytes // self.CHUNK_BYTES) * self.CHUNK_BYTES
+        free = self._free[(dtype, capacity)]
+        if free:
+            return free.pop()
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        return torch.empty(capacity // itemsize, dtype=dtype, pin_memory=True)
+
+    def transfer(
+        self,
+        tensors: Mapping[str, torch.Tensor]
+    ) -> Tuple[Dict[str, torch.Tensor], List[torch.Tensor]]:
+        """
+        Stage tensors through pinned buffers and copy them to the device asynchronously.
+
+        Returns:
+            (tensors on device, rented buffers to pass to `release` once the batch is done)
+        """
+        if not self.enabled:
+            return {name: tensor.to(self.device) for name, tensor in tensors.items()}, []
+
+        on_device = {}
+        rented = []
+        for name, tensor in tensors.items():
+            buffer = self._rent(tensor.dtype, tensor.numel() * tensor.element_size())
+            staged = buffer[:tensor.numel()].view(tensor.shape)
+            staged.copy_(tensor)
+            on_device[name] = staged.to(self.device, non_blocking=True)
+            rented.append(buffer)
+        return on_device, rented
+
+    def release(self, buffers: List[torch.Tensor]):
+        """
+        Return buffers to the pool.
+
+        Only call after the device has consumed the copies (e.g. after results were
+        moved back to the host), otherwise a pending async copy could be overwritten.
+        """
+        for buffer in buffers:
+            key = (buffer.dtype, buffer.numel() * buffer.element_size())
+            if len(self._free[key]) < self.max_per_bucket:
+                self._free[key].append(buffer)
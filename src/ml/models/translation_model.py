@@ -12,9 +12,18 @@ Model: IndicTrans2 or custom fine-tuned mBART for medical terminology
 
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, M2M100ForConditionalGeneration, M2M100Tokenizer
-from typing import List, Union, Optional
+from typing import Dict, List, Optional, Tuple, Union
 import re
 
+import sys
+from pathlib import Path
+
+# Add parent directory to path so the examples below also run as scripts
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models.model_setup import ensure_unquantized, prepare_for_inference
+from models.pinned_pool import PinnedPool
+
 
 class TranslationModel:
     """
@@ -44,7 +53,9 @@ class TranslationModel:
     def __init__(
         self,
         model_name: str = "facebook/m2m100_418M",
-        device: str = "cuda" if torch.cuda.is_available() else "cpu"
+        device: str = "cuda" if torch.cuda.is_available() else "cpu",
+        quantize: Optional[bool] = None,
+        draft_model_name: Optional[str] = None
     ):
         """
         Initialize translation model.
@@ -52,10 +63,17 @@ class TranslationModel:
         Args:
             model_name: Pretrained model (e.g., 'm2m100', 'IndicTrans2')
             device: Computing device
+            quantize: Apply INT8 dynamic quantization (defaults to True on CPU)
+            draft_model_name: Smaller model sharing the tokenizer, used for assisted decoding
         """
         self.device = device
         self.model_name = model_name
         
+        # Single alternation so one scan finds the first Indic script character
+        self._detect_re = re.compile(
+            '|'.join(f'(?P<{lang}>{pattern})' for lang, pattern in self.UNICODE_PATTERNS.items())
+        )
+        
         if "m2m100" in model_name.lower():
             self.tokenizer = M2M100Tokenizer.from_pretrained(model_name)
             self.model = M2M100ForConditionalGeneration.from_pretrained(model_name).to(device)
@@ -63,7 +81,19 @@ class TranslationModel:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
             self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(device)
         
-        self.model.eval()
+        # FP16 on GPU, INT8 dynamic quantization on CPU
+        self.model, self.quantized = prepare_for_inference(self.model, device, quantize)
+        
+        # Pinned staging buffers for async host-to-device copies
+        self._pinned_pool = PinnedPool(device)
+        
+        # Optional draft model: the main model only verifies its proposed tokens
+        self._draft = None
+        if draft_model_name is not None:
+            self._draft = AutoModelForSeq2SeqLM.from_pretrained(draft_model_name).to(device)
+            if 'cuda' in device:
+                self._draft = self._draft.half()
+            self._draft.eval()
     
     def detect_language(self, text: str) -> str:
         """
@@ -75,9 +105,9 @@ class TranslationModel:
         Returns:
             Language code ('en', 'hi', 'or', 'as')
         """
-        for lang, pattern in self.UNICODE_PATTERNS.items():
-            if re.search(pattern, text):
-                return self.LANG_CODES[lang]
+        match = self._detect_re.search(text)
+        if match and match.lastgroup:
+            return self.LANG_CODES[match.lastgroup]
         return 'en'  # Default to English
     
     def translate(
@@ -85,7 +115,9 @@ class TranslationModel:
         texts: Union[str, List[str]],
         source_lang: Optional[str] = None,
         target_lang: str = 'en',
-        max_length: int = 512
+        max_length: int = 512,
+        batch_size: int = 16,
+        fast: bool = True
     ) -> Union[str, List[str]]:
         """
         Translate text(s) from source to target language.
@@ -95,6 +127,8 @@ class TranslationModel:
             source_lang: Source language code (auto-detected if None)
             target_lang: Target language code
             max_length: Maximum sequence length
+            batch_size: Number of same-language texts per generate() call
+            fast: Greedy (or assisted) decoding; set False for beam search
             
         Returns:
             Translated text(s)
@@ -103,56 +137,73 @@ class TranslationModel:
         if single_input:
             texts = [texts]
         
-        translated = []
+        # Every slot is filled below, either untranslated or from generate()
+        translated: List[str] = [''] * len(texts)
+        use_amp = 'cuda' in self.device
         
-        with torch.no_grad():
-            for text in texts:
-                # Auto-detect source language if not provided
-                if source_lang is None:
-                    detected_lang = self.detect_language(text)
-                else:
-                    detected_lang = source_lang
-                
-                # Skip translation if source and target are the same
-                if detected_lang == target_lang:
-                    translated.append(text)
-                    continue
-                
+        # Group texts by source language so each group is one batched generate() call
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        for i, text in enumerate(texts):
+            # Auto-detect source language if not provided
+            detected_lang = source_lang if source_lang is not None else self.detect_language(text)
+            
+            # Skip translation if source and target are the same
+            if detected_lang == target_lang:
+                translated[i] = text
+                continue
+            
+            groups.setdefault(detected_lang, []).append((i, text))
+        
+        with torch.inference_mode(), torch.amp.autocast('cuda', dtype=torch.float16, enabled=use_amp):
+            for detected_lang, items in groups.items():
                 # Set source language for tokenizer
                 if hasattr(self.tokenizer, 'src_lang'):
                     self.tokenizer.src_lang = detected_lang
                 
-                # Tokenize
-                encoded = self.tokenizer(
-                    text,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=max_length
-                ).to(self.device)
+                # Batch texts of similar length together to minimise padding
+                items.sort(key=lambda item: len(item[1]))
                 
-                # Generate translation
-                if hasattr(self.tokenizer, 'get_lang_id'):
-                    # M2M100 model
-                    forced_bos_token_id = self.tokenizer.get_lang_id(target_lang)
-                    generated = self.model.generate(
-                        **encoded,
-                        forced_bos_token_id=forced_bos_token_id,
-                        max_length=max_length,
-                        num_beams=5,
-                        early_stopping=True
+                for start in range(0, len(items), batch_size):
+                    chunk = items[start:start + batch_size]
+                    
+                    # Tokenize
+                    encoded = self.tokenizer(
+                        [text for _, text in chunk],
+                        return_tensors="pt",
+                        padding=True,
+                        pad_to_multiple_of=8,
+                        truncation=True,
+                        max_length=max_length
                     )
-                else:
-                    generated = self.model.generate(
-                        **encoded,
-                        max_length=max_length,
-                        num_beams=5,
-                        early_stopping=True
+                    encoded, staged = self._pinned_pool.transfer(encoded)
+                    
+                    # Scale decoding effort with input length: short queries decode greedily
+                    # (padded length, so <= 16 covers inputs under 16 real tokens)
+                    input_len = encoded['input_ids'].shape[1]
+                    num_beams = 1 if fast or input_len <= 16 else 4
+                    gen_kwargs = dict(
+                        max_new_tokens=min(max_length, int(input_len * 1.5) + 8),
+                        num_beams=num_beams,
+                        do_sample=False,
+                        use_cache=True
                     )
-                
-                # Decode
-                translated_text = self.tokenizer.decode(generated[0], skip_special_tokens=True)
-                translated.append(translated_text)
+                    if num_beams > 1:
+                        gen_kwargs['early_stopping'] = True
+                    elif self._draft is not None and len(chunk) == 1:
+                        # Assisted decoding only supports a batch size of 1
+                        gen_kwargs['assistant_model'] = self._draft
+                    if hasattr(self.tokenizer, 'get_lang_id'):
+                        # M2M100 model
+                        gen_kwargs['forced_bos_token_id'] = self.tokenizer.get_lang_id(target_lang)
+                    
+                    # Generate translation
+                    generated = self.model.generate(**encoded, **gen_kwargs)
+                    
+                    # Decode and scatter back to original positions
+                    decoded = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+                    self._pinned_pool.release(staged)
+                    for (i, _), translated_text in zip(chunk, decoded):
+                        translated[i] = translated_text
         
         return translated[0] if single_input else translated
     
@@ -166,15 +217,16 @@ class TranslationModel:
     
     def save(self, path: str):
         """Save model to disk"""
+        ensure_unquantized(self.quantized, "save")
         self.model.save_pretrained(path)
         self.tokenizer.save_pretrained(path)
     
     @classmethod
-    def load(cls, path: str, device: str = None):
+    def load(cls, path: str, device: str = None, draft_model_name: Optional[str] = None):
         """Load model from disk"""
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
-        return cls(model_name=path, device=device)
+        return cls(model_name=path, device=device, draft_model_name=draft_model_name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+Unit Tests for Request Micro-Batching
+
+Exercises MicroBatcher with plain Python stand-ins for the models.
+
+Run: pytest src/ml/tests/test_batching.py
+"""
+
+import asyncio
+import sys
+import pytest
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from inference.batching import MicroBatcher
+
+
+class RecordingModel:
+    """Upper-cases texts, records every call and fails on 'boom'"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts: List[str], **options) -> List[str]:
+        self.calls.append((list(texts), options))
+        if 'boom' in texts:
+            raise ValueError("bad payload")
+        suffix = options.get('suffix', '')
+        return [text.upper() + suffix for text in texts]
+
+
+async def _with_batcher(model, coro_fn, max_batch_size: int = 64, max_latency_ms: float = 20):
+    """Run `coro_fn(batcher)` against a started batcher and always stop it"""
+    batcher = MicroBatcher(model, asyncio.Lock(), max_batch_size=max_batch_size, max_latency_ms=max_latency_ms)
+    batcher.start()
+    try:
+        return await coro_fn(batcher)
+    finally:
+        await batcher.stop()
+
+
+def test_results_are_split_back_per_request():
+    """Test that concurrent requests share one call and get their own results in order"""
+    model = RecordingModel()
+
+    async def scenario(batcher):
+        return await asyncio.gather(
+            batcher.submit(['a', 'b']),
+            batcher.submit(['c']),
+            batcher.submit(['d', 'e', 'f']),
+        )
+
+    results = asyncio.run(_with_batcher(model, scenario))
+
+    assert results == [['A', 'B'], ['C'], ['D', 'E', 'F']]
+    assert len(model.calls) == 1
+    assert model.calls[0][0] == ['a', 'b', 'c', 'd', 'e', 'f']
+
+
+def test_requests_with_different_options_are_not_mixed():
+    """Test that keyword arguments partition the batch"""
+    model = RecordingModel()
+
+    async def scenario(batcher):
+        return await asyncio.gather(
+            batcher.submit(['a'], suffix='!'),
+            batcher.submit(['b']),
+            batcher.submit(['c'], suffix='!'),
+        )
+
+    results = asyncio.run(_with_batcher(model, scenario))
+
+    assert results == [['A!'], ['B'], ['C!']]
+    assert sorted(texts for texts, _ in model.calls) == [['a', 'c'], ['b']]
+
+
+def test_empty_texts():
+    """Test that an empty request resolves alongside non-empty ones"""
+    model = RecordingModel()
+
+    async def scenario(batcher):
+        return await asyncio.gather(batcher.submit([]), batcher.submit(['a']))
+
+    assert asyncio.run(_with_batcher(model, scenario)) == [[], ['A']]
+
+
+def test_failing_request_does_not_fail_its_batch():
+    """Test that only the bad payload fails when a fused call raises"""
+    model = RecordingModel()
+
+    async def scenario(batcher):
+        return await asyncio.gather(
+            batcher.submit(['x']),
+            batcher.submit(['boom']),
+            batcher.submit(['y']),
+            return_exceptions=True
+        )
+
+    good, bad, other = asyncio.run(_with_batcher(model, scenario))
+
+    assert good == ['X']
+    assert other == ['Y']
+    assert isinstance(bad, ValueError)
+
+
+def test_batch_size_limit():
+    """Test that a full batch is dispatched without waiting for more requests"""
+    model = RecordingModel()
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit([str(i)]) for i in range(5)))
+
+    results = asyncio.run(_with_batcher(model, scenario, max_batch_size=2))
+
+    assert results == [[str(i)] for i in range(5)]
+    assert all(len(texts) <= 2 for texts, _ in model.calls)
+
+
+def test_stop_cancels_background_task():
+    """Test that stop() ends the batching task and is safe before start()"""
+
+    async def scenario():
+        batcher = MicroBatcher(RecordingModel(), asyncio.Lock())
+        await batcher.stop()
+
+        batcher.start()
+        assert await batcher.submit(['a']) == ['A']
+        await batcher.stop()
+        return batcher._task
+
+    task = asyncio.run(scenario())
+
+    assert task.done()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
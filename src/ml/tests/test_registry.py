@@ -7,35 +7,59 @@ Run: pytest src/ml/tests/test_registry.py
 """
 
 import json
+import sys
 import pytest
+from functools import lru_cache
 from pathlib import Path
+from typing import Tuple
 import tempfile
 import shutil
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
 
-def test_registry_structure():
-    """Test that registry.json has correct structure"""
-    registry_path = Path(__file__).parent.parent / "models" / "registry.json"
-    
-    assert registry_path.exists(), "Registry file should exist"
-    
-    with open(registry_path, 'r') as f:
-        registry = json.load(f)
+from training import registry_cache
+from training.update_registry import VERSION_RE, update_model_version, update_model_versions
+
+_REGISTRY_PATH = Path(__file__).resolve().parent.parent / "models" / "registry.json"
+
+
+@lru_cache(maxsize=256)
+def _parse(version: str) -> Tuple[int, int, int]:
+    """Parse 'vX.Y.Z' into integers"""
+    assert version.startswith('v'), f"version should start with 'v': {version}"
+    major, minor, patch = version[1:].split('.', 2)
+    return int(major), int(minor), int(patch)
+
+
+def _mutate(path: Path, key: str, value):
+    """Read a registry file, set one key and write it back"""
+    registry = json.loads(path.read_text())
+    registry[key] = value
+    path.write_text(json.dumps(registry, separators=(',', ':')))
+
+
+@pytest.fixture(scope="session")
+def registry():
+    """Load the checked-in registry.json once per test session"""
+    assert _REGISTRY_PATH.exists(), "Registry file should exist"
     
+    return registry_cache.load(_REGISTRY_PATH)
+
+
+def test_registry_structure(registry):
+    """Test that registry.json has correct structure"""
     # Check required keys
     assert 'embedding_model' in registry
     assert 'emergency_classifier' in registry
     assert 'translation_model' in registry
     
     # Check version format
-    import re
-    version_pattern = r'v\d+\.\d+\.\d+$'
-    
-    assert re.match(version_pattern, registry['embedding_model']), \
+    assert VERSION_RE.match(registry['embedding_model']), \
         "embedding_model version should match vX.Y.Z format"
-    assert re.match(version_pattern, registry['emergency_classifier']), \
+    assert VERSION_RE.match(registry['emergency_classifier']), \
         "emergency_classifier version should match vX.Y.Z format"
-    assert re.match(version_pattern, registry['translation_model']), \
+    assert VERSION_RE.match(registry['translation_model']), \
         "translation_model version should match vX.Y.Z format"
 
 
@@ -51,56 +75,95 @@ def test_version_update():
             "translation_model": "v1.0.0"
         }
         
-        with open(temp_registry, 'w') as f:
-            json.dump(initial_data, f)
+        temp_registry.write_text(json.dumps(initial_data))
         
         # Update version
         new_version = "v1.1.0"
         
         # Simulate update
-        with open(temp_registry, 'r') as f:
-            registry = json.load(f)
-        
-        registry['embedding_model'] = new_version
-        
-        with open(temp_registry, 'w') as f:
-            json.dump(registry, f, indent=2)
+        _mutate(temp_registry, 'embedding_model', new_version)
         
         # Verify update
-        with open(temp_registry, 'r') as f:
-            updated_registry = json.load(f)
+        updated_registry = json.loads(temp_registry.read_text())
         
         assert updated_registry['embedding_model'] == new_version
         assert updated_registry['emergency_classifier'] == "v1.0.0"
 
 
+def test_update_model_version_in_process():
+    """Test that the updater rewrites the registry and reports unknown models"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp_registry = Path(tmpdir) / "registry.json"
+        
+        temp_registry.write_text(json.dumps({"embedding_model": "v1.0.0", "translation_model": "v1.0.0"}))
+        
+        assert update_model_version("embedding_model", "v1.0.1", temp_registry, compact=True)
+        assert not update_model_version("unknown_model", "v1.0.1", temp_registry, compact=True)
+        
+        updated = json.loads(temp_registry.read_text())
+        
+        assert updated['embedding_model'] == "v1.0.1"
+        assert updated['translation_model'] == "v1.0.0"
+        assert 'last_updated' in updated
+        assert b'\n' not in temp_registry.read_bytes()
+
+
+def test_update_model_versions_batch():
+    """Test that several bumps are applied together and unknown models abort the batch"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp_registry = Path(tmpdir) / "registry.json"
+        
+        temp_registry.write_text(json.dumps({"embedding_model": "v1.0.0", "translation_model": "v1.0.0"}))
+        
+        assert not update_model_versions(
+            {"embedding_model": "v9.9.9", "unknown_model": "v1.0.1"}, temp_registry, compact=True
+        )
+        assert json.loads(temp_registry.read_text())['embedding_model'] == "v1.0.0"
+        
+        assert update_model_versions(
+            {"embedding_model": "v1.0.1", "translation_model": "v1.1.0"}, temp_registry, compact=True
+        )
+        
+        updated = json.loads(temp_registry.read_text())
+        
+        assert updated['embedding_model'] == "v1.0.1"
+        assert updated['translation_model'] == "v1.1.0"
+        assert list(Path(tmpdir).iterdir()) == [temp_registry], "no temp file should be left behind"
+
+
+def test_registry_cache_invalidation():
+    """Test that cached registries are reused until the file changes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp_registry = Path(tmpdir) / "registry.json"
+        
+        temp_registry.write_text(json.dumps({"embedding_model": "v1.0.0"}))
+        
+        first = registry_cache.load(temp_registry)
+        assert registry_cache.load(temp_registry) is first
+        
+        assert update_model_version("embedding_model", "v1.0.1", temp_registry, compact=True)
+        
+        assert first['embedding_model'] == "v1.0.0", "cached registry should not be mutated"
+        assert registry_cache.load(temp_registry)['embedding_model'] == "v1.0.1"
+
+
 def test_version_bump_logic():
     """Test semantic version bumping logic"""
-    import re
     
     def bump_patch(version: str) -> str:
         """Bump patch version (v1.0.0 → v1.0.1)"""
-        match = re.match(r'v(\d+)\.(\d+)\.(\d+)', version)
-        if match:
-            major, minor, patch = map(int, match.groups())
-            return f"v{major}.{minor}.{patch + 1}"
-        return version
+        major, minor, patch = _parse(version)
+        return f"v{major}.{minor}.{patch + 1}"
     
     def bump_minor(version: str) -> str:
         """Bump minor version (v1.0.0 → v1.1.0)"""
-        match = re.match(r'v(\d+)\.(\d+)\.(\d+)', version)
-        if match:
-            major, minor, patch = map(int, match.groups())
-            return f"v{major}.{minor + 1}.0"
-        return version
+        major, minor, patch = _parse(version)
+        return f"v{major}.{minor + 1}.0"
     
     def bump_major(version: str) -> str:
         """Bump major version (v1.0.0 → v2.0.0)"""
-        match = re.match(r'v(\d+)\.(\d+)\.(\d+)', version)
-        if match:
-            major, minor, patch = map(int, match.groups())
-            return f"v{major + 1}.0.0"
-        return version
+        major, minor, patch = _parse(version)
+        return f"v{major + 1}.0.0"
     
     # Test patch bump
     assert bump_patch("v1.0.0") == "v1.0.1"
@@ -130,21 +193,13 @@ def test_metadata_preservation():
             }
         }
         
-        with open(temp_registry, 'w') as f:
-            json.dump(initial_data, f)
+        temp_registry.write_text(json.dumps(initial_data))
         
         # Update version
-        with open(temp_registry, 'r') as f:
-            registry = json.load(f)
-        
-        registry['embedding_model'] = "v1.1.0"
-        
-        with open(temp_registry, 'w') as f:
-            json.dump(registry, f)
+        _mutate(temp_registry, 'embedding_model', "v1.1.0")
         
         # Verify metadata preserved
-        with open(temp_registry, 'r') as f:
-            updated = json.load(f)
+        updated = json.loads(temp_registry.read_text())
         
         assert 'metadata' in updated
         assert updated['metadata']['embedding_model']['dimension'] == 768
@@ -0,0 +1,101 @@
+"""
+Streaming Training Datasets
+
+Lazily reads (query, document, similarity_score) pairs from CSV so large
+training sets are never materialized as a list of InputExample objects.
+
+Streaming depends on the sentence-transformers 2.x `fit` loop, which pulls
+batches from the DataLoader as it trains (3.x `fit` loads all data into memory).
+The module is deliberately not called `datasets.py`: the training scripts run
+with this directory on sys.path, where it would shadow the Hugging Face package.
+"""
+
+import csv
+import random
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from sentence_transformers import InputExample
+from torch.utils.data import IterableDataset, get_worker_info
+
+
+class HealthPairStream(IterableDataset):
+    """
+    Iterable dataset yielding InputExample pairs from a CSV file.
+
+    Rows are sharded across DataLoader workers so each row is yielded once per
+    epoch. Since an IterableDataset cannot be shuffled by the DataLoader, an
+    optional shuffle buffer mixes rows as they are streamed.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        has_header: bool = True,
+        shuffle_buffer: int = 0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            path: CSV with columns [query, document, similarity_score]
+            has_header: Skip the first row
+            shuffle_buffer: Number of rows to buffer for shuffling (0 keeps file order)
+            seed: Seed for the shuffle buffer
+        """
+        self.path = Path(path)
+        self.has_header = has_header
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self._epoch = 0
+        self._num_rows: Optional[int] = None
+
+    def _rows(self) -> Iterator[list]:
+        """Stream raw CSV rows belonging to the current worker"""
+        worker = get_worker_info()
+        num_workers, worker_id = (worker.num_workers, worker.id) if worker else (1, 0)
+
+        with open(self.path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            if self.has_header:
+                next(reader, None)
+            for i, row in enumerate(reader):
+                if i % num_workers == worker_id:
+                    yield row
+
+    def __iter__(self) -> Iterator[InputExample]:
+        examples = (
+            InputExample(texts=[row[0], row[1]], label=float(row[2]))
+            for row in self._rows()
+        )
+
+        if self.shuffle_buffer <= 0:
+            yield from examples
+            return
+
+        # Offset the seed per epoch and worker so orders differ but stay reproducible
+        worker = get_worker_info()
+        seed = None if self.seed is None else self.seed + self._epoch * 1000 + (worker.id if worker else 0)
+        self._epoch += 1
+        rng = random.Random(seed)
+
+        buffer: List[InputExample] = []
+        for example in examples:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(example)
+                continue
+            idx = rng.randrange(self.shuffle_buffer)
+            yield buffer[idx]
+            buffer[idx] = example
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __len__(self) -> int:
+        """
+        Number of examples, counted with one pass over the file (cached).
+
+        `fit` needs the DataLoader length for its steps per epoch and warmup.
+        """
+        if self._num_rows is None:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                self._num_rows = sum(1 for _ in csv.reader(f)) - int(self.has_header)
+        return max(self._num_rows, 0)
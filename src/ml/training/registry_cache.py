@@ -0,0 +1,44 @@
+"""
+Model Registry Cache
+
+In-memory cache of parsed registry.json files, invalidated whenever the file
+changes on disk. The trainer, the updater and the tests all read the registry;
+each file version is read and parsed once.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None  # type: ignore[assignment]
+
+
+@lru_cache(maxsize=8)
+def _load(path: str, stamp: Tuple[int, int, int]) -> dict:
+    """Parse a registry file; `stamp` only serves as the cache key"""
+    data = Path(path).read_bytes()
+    registry: dict = orjson.loads(data) if orjson is not None else json.loads(data)
+    return registry
+
+
+def load(path: Union[str, Path]) -> dict:
+    """
+    Load a registry file, reusing the parsed result until the file changes.
+
+    The cache key includes the file's mtime, size and inode, so in-place edits
+    and atomic replacements are both picked up.
+
+    The returned dict is shared between callers: copy it before mutating.
+    """
+    p = Path(path)
+    st = p.stat()
+    return _load(str(p), (st.st_mtime_ns, st.st_size, st.st_ino))
+
+
+def clear():
+    """Drop all cached registries"""
+    _load.cache_clear()
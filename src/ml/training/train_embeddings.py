@@ -8,17 +8,27 @@ Usage:
     python train_embeddings.py --config config.yaml
 """
 
-import torch
-from sentence_transformers import SentenceTransformer, InputExample, losses
-from sentence_transformers.evaluation import EmbeddingSimilarityEvaluator
-from torch.utils.data import DataLoader
 import argparse
+from contextlib import nullcontext
+import sys
 import yaml
 from pathlib import Path
-from typing import List, Tuple
-import wandb
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 from loguru import logger
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from training import registry_cache
+from training.update_registry import _REGISTRY_PATH, parse_version, update_model_versions
+
+# torch, sentence_transformers and wandb are imported where they are used, so
+# importing this module (CLI --help, tests, type hints) does not pay for them
+if TYPE_CHECKING:
+    import torch
+    from sentence_transformers import InputExample
+    from training.pair_stream import HealthPairStream
+
 
 class HealthEmbeddingTrainer:
     """
@@ -26,6 +36,18 @@ class HealthEmbeddingTrainer:
     """
     
     def __init__(self, config: dict):
+        import torch
+        import sentence_transformers
+        from sentence_transformers import SentenceTransformer
+        
+        # train() relies on the 2.x fit loop, which streams the DataLoader;
+        # 3.x fit() materializes every example into an in-memory Dataset
+        if int(sentence_transformers.__version__.split('.')[0]) >= 3:
+            raise RuntimeError(
+                f"sentence-transformers {sentence_transformers.__version__} is not supported; "
+                "install sentence-transformers<3 (see requirements.txt)"
+            )
+        
         self.config = config
         self.model_name = config['model']['base_model']
         self.output_dir = Path(config['training']['output_dir'])
@@ -34,30 +56,66 @@ class HealthEmbeddingTrainer:
         # Initialize model
         self.model = SentenceTransformer(self.model_name)
         
+        # Compile the transformer backbone (PyTorch 2.x)
+        if config['training'].get('compile', False) and hasattr(torch, 'compile'):
+            self._compile_backbone(config['training'].get('compile_mode', 'max-autotune'))
+        
         # Setup logging
         if config['training'].get('use_wandb', False):
+            import wandb
             wandb.init(project="swasthya-sahayak", config=config)
     
-    def load_training_data(self) -> List[InputExample]:
+    def _compile_backbone(self, mode: str):
+        """
+        Replace the Transformer module's HF model with its torch.compile'd wrapper.
+        
+        The HF model is registered as `auto_model` on older sentence-transformers and
+        as `model` on newer ones (where `auto_model` is a read-only alias), so the
+        registered submodule that forward() actually calls is swapped in place.
+        That keeps a single copy of the weights in state_dict, and save_pretrained
+        is forwarded to the original module, so saved checkpoints are unaffected.
+        """
+        import torch
+        from torch._dynamo.eval_frame import OptimizedModule
+        
+        backbone = self.model[0]
+        name = 'model' if 'model' in backbone._modules else 'auto_model'
+        setattr(backbone, name, torch.compile(backbone._modules[name], mode=mode))
+        
+        if isinstance(backbone._modules[name], OptimizedModule):
+            logger.info(f"Compiled backbone.{name} with torch.compile(mode='{mode}')")
+        else:
+            logger.warning(f"torch.compile did not wrap backbone.{name}; training uncompiled")
+    
+    def load_training_data(self) -> Union['HealthPairStream', List['InputExample']]:
         """
         Load training pairs (query, document, label).
         
         Format: CSV with columns [query, document, similarity_score]
+        The CSV is streamed lazily; placeholder pairs are used if it is missing.
         """
+        from sentence_transformers import InputExample
+        from training.pair_stream import HealthPairStream
+        
         data_path = Path(self.config['data']['train_path'])
         logger.info(f"Loading training data from {data_path}")
         
-        examples = []
+        if data_path.exists():
+            stream = HealthPairStream(
+                data_path,
+                shuffle_buffer=self.config['data'].get('shuffle_buffer', 1000),
+                seed=self.config['training'].get('seed')
+            )
+            logger.info(f"Streaming {len(stream)} training examples")
+            return stream
         
-        # TODO: Implement actual data loading
-        # For now, placeholder structure
+        logger.warning(f"{data_path} not found, using placeholder training data")
         sample_data = [
             ("What are malaria symptoms?", "Malaria symptoms include fever, chills, headache", 0.9),
             ("How to prevent TB?", "TB prevention includes BCG vaccination, avoiding close contact", 0.85),
         ]
         
-        for query, doc, score in sample_data:
-            examples.append(InputExample(texts=[query, doc], label=float(score)))
+        examples = [InputExample(texts=[query, doc], label=float(score)) for query, doc, score in sample_data]
         
         logger.info(f"Loaded {len(examples)} training examples")
         return examples
@@ -72,26 +130,69 @@ class HealthEmbeddingTrainer:
             ("दस्त का इलाज क्या है?", "ORS solution and zinc supplements for diarrhea", 0.8),
         ]
     
+    def _mixed_precision(self) -> Tuple[bool, Optional['torch.dtype']]:
+        """
+        Resolve `training.precision` (fp32 | fp16 | bf16) for the current device.
+        
+        Returns:
+            (use_amp flag for fit, dtype for an outer autocast region or None)
+        """
+        import torch
+        
+        precision = self.config['training'].get('precision', 'fp32')
+        if precision not in ('fp32', 'fp16', 'bf16'):
+            raise ValueError(f"Unknown precision '{precision}', expected fp32, fp16 or bf16")
+        
+        if precision == 'fp32':
+            return False, None
+        if not torch.cuda.is_available():
+            logger.warning(f"{precision} requested but CUDA is not available, training in fp32")
+            return False, None
+        if precision == 'bf16':
+            if torch.cuda.is_bf16_supported():
+                # bf16 has the fp32 exponent range, so no GradScaler is needed
+                return False, torch.bfloat16
+            logger.warning("bf16 not supported on this GPU, falling back to fp16")
+        return True, None
+    
     def train(self):
         """Execute training loop"""
+        import torch
+        from sentence_transformers import losses
+        from sentence_transformers.evaluation import EmbeddingSimilarityEvaluator
+        from torch.utils.data import DataLoader, IterableDataset
+        
         # Load data
         train_examples = self.load_training_data()
         val_data = self.load_validation_data()
         
         # Create dataloader
+        # Streamed data is shuffled by its own buffer; workers overlap
+        # collation with the forward pass and pinned batches copy asynchronously.
+        # These settings take effect because the 2.x fit loop (sentence-transformers<3,
+        # enforced in __init__) iterates this DataLoader directly; 3.x would rebuild it.
+        num_workers = self.config['training'].get('num_workers', 4)
+        worker_kwargs = {}
+        if num_workers > 0:
+            worker_kwargs = {
+                'persistent_workers': True,
+                'prefetch_factor': self.config['training'].get('prefetch_factor', 4),
+            }
         train_dataloader = DataLoader(
             train_examples,
-            shuffle=True,
-            batch_size=self.config['training']['batch_size']
+            shuffle=not isinstance(train_examples, IterableDataset),
+            batch_size=self.config['training']['batch_size'],
+            num_workers=num_workers,
+            pin_memory=torch.cuda.is_available(),
+            **worker_kwargs
         )
         
         # Define loss function
         train_loss = losses.CosineSimilarityLoss(self.model)
         
         # Setup evaluator
-        sentences1 = [item[0] for item in val_data]
-        sentences2 = [item[1] for item in val_data]
-        scores = [item[2] for item in val_data]
+        sentences1, sentences2, scores = map(list, zip(*val_data))
+        assert len(sentences1) == len(sentences2) == len(scores) == len(val_data)
         
         evaluator = EmbeddingSimilarityEvaluator(
             sentences1, sentences2, scores,
@@ -102,54 +203,60 @@ class HealthEmbeddingTrainer:
         num_epochs = self.config['training']['num_epochs']
         warmup_steps = int(len(train_dataloader) * num_epochs * 0.1)
         
+        use_amp, autocast_dtype = self._mixed_precision()
+        autocast = (
+            torch.autocast(device_type='cuda', dtype=autocast_dtype)
+            if autocast_dtype is not None else nullcontext()
+        )
+        
         logger.info(f"Starting training for {num_epochs} epochs")
         
         # Train
-        self.model.fit(
-            train_objectives=[(train_dataloader, train_loss)],
-            evaluator=evaluator,
-            epochs=num_epochs,
-            warmup_steps=warmup_steps,
-            output_path=str(self.output_dir),
-            save_best_model=True,
-            evaluation_steps=self.config['training']['eval_steps'],
-            checkpoint_save_steps=self.config['training']['save_steps'],
-        )
+        with autocast:
+            self.model.fit(
+                train_objectives=[(train_dataloader, train_loss)],
+                evaluator=evaluator,
+                epochs=num_epochs,
+                warmup_steps=warmup_steps,
+                output_path=str(self.output_dir),
+                save_best_model=True,
+                evaluation_steps=self.config['training']['eval_steps'],
+                checkpoint_save_steps=self.config['training']['save_steps'],
+                use_amp=use_amp,
+            )
         
         logger.info(f"Training complete. Model saved to {self.output_dir}")
         
         # Auto-update model registry
-        if self.config['training'].get('auto_version_bump', True):
-            import subprocess
-            import re
-            
+        if self.config['training'].get('auto_version_bump', True) and _REGISTRY_PATH.exists():
             # Extract current version from registry
-            registry_path = Path(__file__).parent.parent / "models" / "registry.json"
-            if registry_path.exists():
-                import json
-                with open(registry_path, 'r') as f:
-                    registry = json.load(f)
-                current_version = registry.get('embedding_model', 'v1.0.0')
-                
-                # Bump patch version (v1.0.0 → v1.0.1)
-                match = re.match(r'v(\d+)\.(\d+)\.(\d+)', current_version)
-                if match:
-                    major, minor, patch = map(int, match.groups())
-                    new_version = f"v{major}.{minor}.{patch + 1}"
-                    
-                    # Update registry
-                    try:
-                        subprocess.run([
-                            'python', 
-                            str(Path(__file__).parent / 'update_registry.py'),
-                            'embedding_model',
-                            new_version
-                        ], check=True)
-                        logger.info(f"✅ Model version updated: {current_version} → {new_version}")
-                    except Exception as e:
-                        logger.warning(f"⚠️  Failed to update registry: {e}")
+            registry = registry_cache.load(_REGISTRY_PATH)
+            current_version = registry.get('embedding_model', 'v1.0.0')
+            
+            # Accumulate bumps so the registry is written once (patch: v1.0.0 → v1.0.1)
+            bumps = {}
+            version = parse_version(current_version)
+            if version:
+                major, minor, patch = version
+                bumps['embedding_model'] = f"v{major}.{minor}.{patch + 1}"
+            
+            # Only invoke the updater once every new version is known to be valid
+            if not bumps:
+                logger.warning(f"⚠️  Not bumping malformed registry version '{current_version}'")
+            else:
+                try:
+                    updated = update_model_versions(bumps)
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to update registry: {e}")
+                else:
+                    if updated:
+                        for model_name, new_version in bumps.items():
+                            logger.info(f"✅ Model version updated: {registry[model_name]} → {new_version}")
+                    else:
+                        logger.warning("⚠️  Failed to update registry")
         
         if self.config['training'].get('use_wandb', False):
+            import wandb
             wandb.finish()
 
 
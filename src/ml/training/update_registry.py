@@ -6,66 +6,184 @@ Part of MLOps workflow for version tracking and deployment.
 
 Usage:
     python update_registry.py <model_name> <new_version>
+    python update_registry.py --set <model_name>=<new_version> [--set ...]
 
 Example:
     python update_registry.py embedding_model v1.1.0
+    python update_registry.py --set embedding_model=v1.1.0 --set emergency_classifier=v1.0.1
 """
 
+import argparse
 import json
+import os
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
+from time import gmtime, strftime
+from typing import Dict, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None  # type: ignore[assignment]
 
-def update_model_version(model_name: str, new_version: str):
-    """Update model version in registry"""
-    registry_path = Path(__file__).parent.parent / "models" / "registry.json"
+try:
+    from training import registry_cache
+except ImportError:  # run as a script from the training directory
+    import registry_cache
+
+# Default registry location (src/ml/models/registry.json)
+_REGISTRY_PATH = Path(__file__).resolve().parent.parent / "models" / "registry.json"
+
+# Semantic version format used in the registry (vMAJOR.MINOR.PATCH)
+VERSION_RE = re.compile(r'^v(\d+)\.(\d+)\.(\d+)$')
+
+
+def _dumps(registry: dict, compact: bool = False) -> bytes:
+    """
+    Encode registry JSON, using orjson when available.
+    
+    The canonical registry is written with 2-space indentation; `compact` drops
+    all whitespace for transient copies nobody needs to read.
+    """
+    if orjson is not None:
+        return orjson.dumps(registry) if compact else orjson.dumps(registry, option=orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(registry, separators=(',', ':')).encode()
+    return json.dumps(registry, indent=2).encode()
+
+
+def _emit(lines: List[str]):
+    """Write status lines to stdout in one call"""
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+
+@lru_cache(maxsize=256)
+def parse_version(version: str) -> Optional[Tuple[int, int, int]]:
+    """Parse 'vX.Y.Z' into (major, minor, patch), or None if malformed"""
+    match = VERSION_RE.match(version)
+    if match is None:
+        return None
+    major, minor, patch = map(int, match.groups())
+    return major, minor, patch
+
+
+def update_model_versions(
+    updates: Dict[str, str],
+    registry_path: Optional[Path] = None,
+    compact: bool = False
+) -> bool:
+    """
+    Update several model versions in the registry with a single write.
+    
+    Args:
+        updates: Mapping of model name to new version
+        registry_path: Registry file (defaults to models/registry.json)
+        compact: Write without indentation (for transient, non-canonical copies)
+    
+    Returns:
+        True if the registry was updated, False if the registry or any model was not found
+    """
+    if registry_path is None:
+        registry_path = _REGISTRY_PATH
     
     if not registry_path.exists():
-        print(f"❌ Registry not found at {registry_path}")
-        sys.exit(1)
+        _emit([f"❌ Registry not found at {registry_path}"])
+        return False
     
-    # Load registry
-    with open(registry_path, 'r') as f:
-        registry = json.load(f)
+    # Copy the cached registry so other readers never see the pending edits
+    registry = dict(registry_cache.load(registry_path))
     
-    # Validate model name
-    if model_name not in registry:
-        print(f"❌ Model '{model_name}' not found in registry")
-        print(f"Available models: {list(registry.keys())}")
-        sys.exit(1)
+    # Validate model names before touching anything
+    unknown = [name for name in updates if name not in registry]
+    if unknown:
+        lines = [f"❌ Model '{model_name}' not found in registry" for model_name in unknown]
+        lines.append(f"Available models: {', '.join(registry)}")
+        _emit(lines)
+        return False
+    
+    # Update versions
+    changes = []
+    for model_name, new_version in updates.items():
+        changes.append((model_name, registry.get(model_name, "unknown"), new_version))
+        registry[model_name] = new_version
+    registry["last_updated"] = strftime("%Y-%m-%dT%H:%M:%SZ", gmtime())
     
-    # Update version
-    old_version = registry.get(model_name, "unknown")
-    registry[model_name] = new_version
-    registry["last_updated"] = datetime.utcnow().isoformat() + "Z"
+    # Save registry atomically: a crash mid-write leaves the old file intact
+    tmp_path = registry_path.with_suffix('.json.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps(registry, compact))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, registry_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
     
-    # Save registry
-    with open(registry_path, 'w') as f:
-        json.dump(registry, f, indent=2)
+    lines = [
+        f"✅ Updated {model_name}: {old_version} → {new_version}"
+        for model_name, old_version, new_version in changes
+    ]
+    lines.append(f"📝 Registry saved to {registry_path}")
+    _emit(lines)
+    return True
+
+
+def update_model_version(
+    model_name: str,
+    new_version: str,
+    registry_path: Optional[Path] = None,
+    compact: bool = False
+) -> bool:
+    """
+    Update a single model version in registry.
     
-    print(f"✅ Updated {model_name}: {old_version} → {new_version}")
-    print(f"📝 Registry saved to {registry_path}")
+    Returns:
+        True if the registry was updated, False if the registry or model was not found
+    """
+    return update_model_versions({model_name: new_version}, registry_path, compact)
+
+
+def _normalize_version(version: str) -> str:
+    """Add the 'v' prefix if it was left off"""
+    return version if version.startswith('v') else f"v{version}"
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python update_registry.py <model_name> <new_version>")
-        print("\nExample:")
-        print("  python update_registry.py embedding_model v1.1.0")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Update model versions in registry.json',
+        epilog='Example: python update_registry.py --set embedding_model=v1.1.0 --set translation_model=v1.0.1'
+    )
+    parser.add_argument('model_name', nargs='?', help='Model to update')
+    parser.add_argument('new_version', nargs='?', help='New version (e.g., v1.1.0)')
+    parser.add_argument('--set', dest='updates', action='append', default=[],
+                        metavar='MODEL=VERSION', help='Model version to set (repeatable)')
+    args = parser.parse_args()
+    
+    updates = {}
+    if args.model_name or args.new_version:
+        if not (args.model_name and args.new_version):
+            parser.error("both <model_name> and <new_version> are required")
+        updates[args.model_name] = args.new_version
+    for item in args.updates:
+        model_name, sep, new_version = item.partition('=')
+        if not (sep and model_name and new_version):
+            parser.error(f"--set expects MODEL=VERSION, got '{item}'")
+        updates[model_name] = new_version
     
-    model_name = sys.argv[1]
-    new_version = sys.argv[2]
+    if not updates:
+        parser.print_usage()
+        sys.exit(1)
     
     # Validate version format
-    if not new_version.startswith('v'):
-        print("⚠️  Version should start with 'v' (e.g., v1.0.0)")
-        new_version = f"v{new_version}"
+    if not all(version.startswith('v') for version in updates.values()):
+        _emit(["⚠️  Version should start with 'v' (e.g., v1.0.0)"])
+    updates = {name: _normalize_version(version) for name, version in updates.items()}
     
-    update_model_version(model_name, new_version)
+    if not update_model_versions(updates):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-